@@ -1,6 +1,8 @@
+import os
 import re
 import sys
 import textwrap
+import threading
 import traceback
 from logging import INFO
 
@@ -11,6 +13,7 @@ from paramiko.ssh_exception import SSHException
 
 from .exception import SSHKernelNotConnectedException
 from .ssh_wrapper_paramiko import SSHWrapperParamiko
+from .ssh_wrapper_paramiko import drop_client_pool
 from .version import __version__
 
 # 🎯 This regex helps us extract version numbers like "1.2.3" from strings
@@ -98,6 +101,8 @@ class SSHKernel(MetaKernel):
         self.__sshwrapper_class = sshwrapper_class  # Our SSH sidekick
         self._sshwrapper = None  # No connection yet
         self._parameters = dict()  # Empty utility belt
+        # 🐛 Completion chatter in the notebook only when asked for (SSHKERNEL_DEBUG=1)
+        self._debug_complete = os.environ.get("SSHKERNEL_DEBUG") == "1"
 
         # 📝 Set up our log book
         self.log.name = "SSHKernel"
@@ -135,6 +140,19 @@ class SSHKernel(MetaKernel):
         wrapper.connect(host)
         self.sshwrapper = wrapper
 
+        # 🎣 Warm up single-word completions in the background
+        if hasattr(wrapper, "prefetch_commands"):
+            threading.Thread(
+                target=self._prefetch_commands, args=(wrapper,), daemon=True
+            ).start()
+
+    def _prefetch_commands(self, wrapper):
+        """🎣 Runs in a background thread; a failed prefetch just means remote completions"""
+        try:
+            wrapper.prefetch_commands()
+        except Exception:
+            self.log.warning("Command prefetch failed", exc_info=True)
+
     def do_logout(self):
         """
         🔒 Close our portal to the remote server
@@ -203,8 +221,7 @@ class SSHKernel(MetaKernel):
             dict: Possible completions and cursor position info
         """
         # 📝 Keep a log of what we're doing (for when things go wrong)
-        with open('/tmp/kernel_debug.log', 'a') as f:
-            f.write(f"\nCompletion request: code='{code}', cursor_pos={cursor_pos}\n")
+        self.log.debug("Completion request: code=%r, cursor_pos=%d", code, cursor_pos)
 
         # 🎲 Default response - like having a backup plan
         default = {
@@ -220,59 +237,57 @@ class SSHKernel(MetaKernel):
             self.assert_connected()
         except SSHKernelNotConnectedException:
             self.log.error("not connected")
-            with open('/tmp/kernel_debug.log', 'a') as f:
-                f.write("Not connected\n")
             return default
 
         # 🎯 Get the part of the command we're working with
         code_current = code[:cursor_pos]
         if not code_current:
-            with open('/tmp/kernel_debug.log', 'a') as f:
-                f.write("No current code\n")
+            self.log.debug("No current code")
+            return default
+
+        # ⚡ Cursor right after whitespace or ';'? No word to complete, skip the round-trip
+        if code_current[-1].isspace() or code_current[-1] == ";":
+            self.log.debug("Cursor after a separator")
             return default
 
         # 🔨 Break the command into pieces we can work with
         tokens = code_current.replace(";", " ").split()
         if not tokens:
-            with open('/tmp/kernel_debug.log', 'a') as f:
-                f.write("No tokens\n")
+            self.log.debug("No tokens")
             return default
 
         # 🎭 Get the full context of what we're completing
         command_context = " ".join(tokens)
-        token = tokens[-1]
-        token_start = code_current.rindex(token)
 
-        with open('/tmp/kernel_debug.log', 'a') as f:
-            f.write(f"Command context: '{command_context}'\n")
+        self.log.debug("Command context: %r", command_context)
 
-        self.Print(f"[DEBUG] Attempting completion for command: '{command_context}'")
+        if self._debug_complete:
+            self.Print(f"[DEBUG] Attempting completion for command: '{command_context}'")
 
-        # 🎣 Fish for completions from our SSH wrapper
-        matches = self.sshwrapper.get_completions(command_context, self.Print)
+        # 🎣 Fish for completions from our SSH wrapper (it caches them per prompt mode)
+        print_function = self.Print if self._debug_complete else lambda *args: None
+        matches = self.sshwrapper.get_completions(command_context, print_function)
 
-        with open('/tmp/kernel_debug.log', 'a') as f:
-            f.write(f"Got matches: {matches}\n")
+        self.log.debug("Got matches: %r", matches)
 
-        self.Print(f"[DEBUG] Got raw matches: {matches}")
+        if self._debug_complete:
+            self.Print(f"[DEBUG] Got raw matches: {matches}")
 
         if matches:
-            # 🎯 Filter out the good stuff
-            valid_matches = []
-            for match in matches:
-                if match.startswith(command_context) and match != command_context:
-                    # Just get the new part we want to add
-                    completion = match[len(command_context):].lstrip()
-                    if completion:
-                        # Add a space after completion (because we're nice like that)
-                        completion = completion + ' '
-                        self.Print(f"[DEBUG] Adding completion: '{completion}'")
-                        valid_matches.append(completion)
+            # 🎯 Filter out the good stuff: just the new part we want to add,
+            # plus a space after it (because we're nice like that)
+            n = len(command_context)
+            valid_matches = [
+                match[n:].lstrip() + ' '
+                for match in matches
+                if len(match) > n and match.startswith(command_context)
+            ]
+            valid_matches = [v for v in valid_matches if v != ' ']
 
             if valid_matches:
-                self.Print(f"[DEBUG] Final valid matches: {valid_matches}")
-                with open('/tmp/kernel_debug.log', 'a') as f:
-                    f.write(f"Returning valid matches: {valid_matches}\n")
+                if self._debug_complete:
+                    self.Print(f"[DEBUG] Final valid matches: {valid_matches}")
+                self.log.debug("Returning valid matches: %r", valid_matches)
                 return {
                     "matches": valid_matches,
                     "cursor_start": cursor_pos,  # Start from cursor position
@@ -281,9 +296,9 @@ class SSHKernel(MetaKernel):
                     "status": "ok",
                 }
 
-        self.Print("[DEBUG] No valid completions found")
-        with open('/tmp/kernel_debug.log', 'a') as f:
-            f.write("No valid completions\n")
+        if self._debug_complete:
+            self.Print("[DEBUG] No valid completions found")
+        self.log.debug("No valid completions")
         return default
 
     def restart_kernel(self):
@@ -293,6 +308,7 @@ class SSHKernel(MetaKernel):
         Sometimes the best solution is a fresh start!
         """
         self.do_logout()
+        drop_client_pool()  # A real fresh start - no pooled connections either
         self._parameters = dict()
 
     def assert_connected(self):
@@ -326,9 +342,8 @@ class SSHKernel(MetaKernel):
         Returns:
             dict: Completion suggestions
         """
-        with open('/tmp/kernel_debug.log', 'a') as f:
-            f.write(f"\nComplete_code called: code='{code}', cursor_pos={cursor_pos}\n")
-        
+        self.log.debug("complete_code called: code=%r, cursor_pos=%d", code, cursor_pos)
+
         return self.do_complete(code, cursor_pos)
 
     def handle_complete_request(self, stream, ident, parent):
@@ -343,7 +358,6 @@ class SSHKernel(MetaKernel):
             ident: Message identifier
             parent: Parent message
         """
-        with open('/tmp/kernel_debug.log', 'a') as f:
-            f.write("\nHandle_complete_request called\n")
-        
+        self.log.debug("handle_complete_request called")
+
         super().handle_complete_request(stream, ident, parent)
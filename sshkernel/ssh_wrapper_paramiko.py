@@ -1,11 +1,259 @@
+import bisect
+import collections
+import functools
 import os
 import re
+import selectors
+import socket
+import threading
 import time
 import paramiko
 from paramiko import SSHException
 from .ssh_wrapper import SSHWrapper
 import traceback
 
+# 🔍 A Junos prompt at the very end of the output, e.g. "{master:0}[edit]user@host# ".
+# The 'mode' group is the mode character: '>' operational, '#' configuration, '%' shell
+_PROMPT_RE = re.compile(
+    r'(?:\{master:\d+\})?(?:\[edit[^\]]*\])?[a-zA-Z0-9\-_]+@[a-zA-Z0-9\-_]+(?P<mode>[%>#])'
+    r'(?:\s+\(pending changes\))?\s*$'
+)
+
+# 🔢 A prompt at the start of any line (followed by whatever was typed after it)
+_PROMPT_LINE_RE = re.compile(
+    r'^(?:\{master:\d+\})?(?:\[edit[^\]]*\])?[a-zA-Z0-9\-_]+@[a-zA-Z0-9\-_]+[%>#]',
+    re.MULTILINE,
+)
+
+# 🚨 Lines the CLI uses to tell us a command went wrong (anywhere in multi-line output)
+_ERROR_RE = re.compile(
+    r'^\s*(?:error:|unknown command\.|syntax error\.|invalid command\.)',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# 📜 The pager's "there's more" markers at the end of the (raw) output
+_MORE_TAILS = (b'---(more)---', b'---(more 100%)---')
+
+# 🎨 ANSI/CSI control sequences (colours, cursor moves, line erases) - noise for us
+_ANSI_RE = re.compile(rb'\x1b\[[0-9;?]*[A-Za-z]')
+
+# 🔍 Same prompt pattern, for matching raw bytes before we decode anything
+_PROMPT_BYTES_RE = re.compile(_PROMPT_RE.pattern.encode())
+
+# 🙋 A confirmation waiting for the next line, e.g. "Reboot the system ? [yes,no] (no) "
+_QUESTION_RE = re.compile(r'\[yes,no\] \((?:yes|no)\)\s*$')
+_QUESTION_BYTES_RE = re.compile(_QUESTION_RE.pattern.encode())
+
+# 📋 A "Possible completions:" entry, e.g. "> interfaces    Show interface information".
+# The candidate runs up to the double space in front of its description
+_COMPLETION_LINE_RE = re.compile(r'^[ \t]*>?[ \t]*(\S+(?: \S+)*)', re.MULTILINE)
+
+# 🛑 Where a completion listing ends early: an error message or an [edit] banner
+_COMPLETION_END_RE = re.compile(r'^.*(?:error:|\[edit)', re.IGNORECASE | re.MULTILINE)
+
+# 🔀 Commands that move us between modes/hierarchy levels (and so change what completes)
+_MODE_CHANGING_COMMANDS = frozenset({'configure', 'edit', 'exit', 'quit', 'top', 'up'})
+
+# ✏️ Commands that edit the configuration (and so the names that complete, e.g. interfaces)
+_CONFIG_CHANGING_COMMANDS = frozenset({
+    'activate', 'commit', 'copy', 'deactivate', 'delete', 'insert', 'load', 'rename',
+    'rollback', 'set',
+})
+
+# 🗃️ How many completion answers we remember per connection, and for how long (seconds)
+COMPLETION_CACHE_SIZE = 128
+COMPLETION_CACHE_TTL = 30
+
+# ✂️ How much of the end of the output we look at when hunting for a prompt
+PROMPT_TAIL_SIZE = 256
+
+# 🎨 How far back into already-read bytes an unfinished escape sequence can start
+ANSI_LOOKBACK = 32
+
+# 📚 Parsed ssh_config files: path -> (mtime_ns, paramiko.SSHConfig)
+_ssh_config_cache = {}
+
+
+def load_ssh_config(filename):
+    """Parse an ssh_config file, reusing the previous parse while the file is unchanged
+
+    Args:
+        filename: Path to the config file (``~`` is expanded)
+
+    Returns:
+        paramiko.SSHConfig: The parsed config (empty if the file doesn't exist)
+    """
+    path = os.path.expanduser(filename)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return paramiko.SSHConfig()
+
+    cached = _ssh_config_cache.get(path)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+
+    ssh_config = paramiko.SSHConfig()
+    with open(path) as f:
+        ssh_config.parse(f)
+    _ssh_config_cache[path] = (mtime_ns, ssh_config)
+    return ssh_config
+
+
+# 🔑 ~/.ssh/known_hosts, parsed once per version of the file: (mtime_ns, paramiko.HostKeys)
+KNOWN_HOSTS_FILE = "~/.ssh/known_hosts"
+_system_host_keys = (None, None)
+_system_host_keys_lock = threading.Lock()
+
+
+def load_system_host_keys():
+    """Return the user's known_hosts as a paramiko.HostKeys, re-reading it only when it changes"""
+    global _system_host_keys
+    path = os.path.expanduser(KNOWN_HOSTS_FILE)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime_ns = None  # Same as SSHClient.load_system_host_keys(): no file, no keys
+
+    with _system_host_keys_lock:  # Two first connects shouldn't both parse a huge file
+        cached_mtime_ns, host_keys = _system_host_keys
+        if host_keys is None or cached_mtime_ns != mtime_ns:
+            host_keys = paramiko.HostKeys()
+            if mtime_ns is not None:
+                try:
+                    host_keys.load(path)
+                except OSError:  # Unreadable, a directory, gone since the stat...
+                    host_keys = paramiko.HostKeys()  # ...so no keys, like paramiko does
+            _system_host_keys = (mtime_ns, host_keys)
+    return host_keys
+
+
+# 🏊 Idle, still-authenticated clients waiting to be reused.
+# (hostname, username, port, key_filename) -> (released_at, paramiko.SSHClient)
+_client_pool = {}
+_client_pool_lock = threading.Lock()
+CLIENT_POOL_SIZE = 8            # Most idle clients we keep around
+CLIENT_POOL_IDLE_TIMEOUT = 300  # Seconds an idle client may wait before we hang up
+POOLED_SHELL_TIMEOUT = 10       # Seconds a pooled client gets to open a shell before we reconnect
+
+
+def _is_active(client):
+    transport = client.get_transport()
+    return transport is not None and transport.is_active()
+
+
+def _evict_pooled_clients():
+    """Pop idle-too-long and over-capacity clients; caller holds the lock and closes them"""
+    now = time.monotonic()
+    evicted = [
+        key
+        for key, (released_at, _) in _client_pool.items()
+        if now - released_at > CLIENT_POOL_IDLE_TIMEOUT
+    ]
+    # Dicts remember insertion order, so the front of the pool is the oldest release
+    overflow = len(_client_pool) - len(evicted) - CLIENT_POOL_SIZE
+    evicted += [key for key in _client_pool if key not in evicted][:max(overflow, 0)]
+    return [_client_pool.pop(key)[1] for key in evicted]
+
+
+def checkout_client(key):
+    """Take a live pooled client for `key` out of the pool, or None if there isn't one"""
+    with _client_pool_lock:
+        stale = _evict_pooled_clients()
+        entry = _client_pool.pop(key, None)
+
+    for client in stale:
+        client.close()
+
+    if entry is None:
+        return None
+    if _is_active(entry[1]):
+        return entry[1]
+    entry[1].close()
+    return None
+
+
+def checkin_client(key, client):
+    """Park a client in the pool so the next connect to `key` skips the handshake"""
+    if not _is_active(client):
+        client.close()
+        return
+
+    with _client_pool_lock:
+        previous = _client_pool.pop(key, None)
+        _client_pool[key] = (time.monotonic(), client)
+        stale = _evict_pooled_clients()
+
+    if previous:
+        stale.append(previous[1])
+    for old_client in stale:
+        old_client.close()
+
+
+def drop_client_pool():
+    """Close every pooled client for real (e.g. on kernel restart)"""
+    with _client_pool_lock:
+        clients = [client for _, client in _client_pool.values()]
+        _client_pool.clear()
+
+    for client in clients:
+        client.close()
+
+
+def prefix_matches(candidates, prefix):
+    """Pick the entries that extend `prefix` out of a sorted list
+
+    Args:
+        candidates (list): Sorted, duplicate-free completion candidates
+        prefix (str): What the user typed so far
+
+    Returns:
+        list: Candidates starting with `prefix` (but not equal to it), in order
+    """
+    lo = bisect.bisect_left(candidates, prefix)
+    hi = bisect.bisect_left(candidates, prefix + '\uffff', lo)
+    return [c for c in candidates[lo:hi] if c != prefix]
+
+
+def _parse_completions(output):
+    """Return the candidates listed under "Possible completions:" in a '?' answer
+
+    Args:
+        output: Everything read back after sending ``<partial>?``; the first line
+            is our echo and the last one the redrawn prompt
+
+    Returns:
+        list: Candidate words, in the order the device listed them
+    """
+    start = output.find('Possible completions:')
+    if start == -1:
+        return []
+    start = output.find('\n', start) + 1
+    end = output.rfind('\n')  # Leave out the redrawn prompt
+    if not start or end < start:
+        return []
+
+    listing = output[start:end]
+    # A read can swallow more than one prompt (e.g. the redraw plus the one for our
+    # newline), so the listing also ends at the first prompt line
+    for end_re in (_COMPLETION_END_RE, _PROMPT_LINE_RE):
+        stop = end_re.search(listing)
+        if stop:
+            listing = listing[:stop.start()]
+    return _COMPLETION_LINE_RE.findall(listing)
+
+
+def _with_shell_lock(method):
+    """Let only one caller talk to the shell channel at a time (the prefetch thread shares it)"""
+
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._shell_lock:
+            return method(self, *args, **kwargs)
+
+    return locked
+
+
 class SSHWrapperParamiko(SSHWrapper):
     """
     🚀 The Paramiko-powered SSH Wizard!
@@ -40,6 +288,17 @@ class SSHWrapperParamiko(SSHWrapper):
         self._env = {}             # Environment variables (the weather conditions)
         self._shell_channel = None  # Interactive shell channel (for real-time chat)
         self._shell_buffer = ""     # Buffer for shell output (our memory pad)
+        self._selector = None       # Wakes us up when the shell has something to say
+        self._pool_key = None       # Where our client goes back to in the pool
+        self._shell_lock = threading.RLock()  # One conversation with the shell at a time
+        self._prompt_mode = None    # Last prompt's mode character: '>' operational, '#' config
+        self._commands = []         # Prefetched top-level operational commands (sorted)
+        # (host, prompt mode, partial command) -> (fetched_at, completions), least recently used first
+        self._completion_cache = collections.OrderedDict()
+        # 📢 Echo "[ssh] Sending command: ..." per command? Opt in with `%param SSHKERNEL_VERBOSE 1`
+        self._verbose = bool(envdelta_init.get('SSHKERNEL_VERBOSE'))
+        # 🐛 Completion [DEBUG] chatter only when asked for (SSHKERNEL_DEBUG=1, like the kernel)
+        self._debug = os.environ.get('SSHKERNEL_DEBUG') == '1'
 
     def connect(self, host):
         """
@@ -58,24 +317,14 @@ class SSHWrapperParamiko(SSHWrapper):
         if self._client:
             self.close()
 
-        # 🎭 Create and configure our SSH client
-        self._client = paramiko.SSHClient()
-        self._client.load_system_host_keys()
-        self._client.set_missing_host_key_policy(paramiko.WarningPolicy())
-
-        # 📚 Read the SSH config file (our travel guide)
-        ssh_config = paramiko.SSHConfig()
-        user_config_file = os.path.expanduser("~/.ssh/config")
-        if os.path.exists(user_config_file):
-            with open(user_config_file) as f:
-                ssh_config.parse(f)
+        # 📚 Read the SSH config file (our travel guide) - parsed once until it changes
+        ssh_config = load_ssh_config("~/.ssh/config")
 
         # 🔍 Check if username is in the host string (user@host)
         username_from_host = None
-        m = re.search("([^@]+)@(.*)", host)
-        if m:
-            username_from_host = m.group(1)
-            host = m.group(2)
+        user, sep, rest = host.partition('@')
+        if sep and user:
+            username_from_host, host = user, rest
 
         # 🎯 Get the host's configuration
         cfg = ssh_config.lookup(host)
@@ -88,13 +337,44 @@ class SSHWrapperParamiko(SSHWrapper):
         if isinstance(key_filename, list):
             key_filename = key_filename[0]
 
-        # 🚀 Launch the connection!
-        self._client.connect(
-            hostname=hostname,
-            username=username,
-            port=port,
-            key_filename=key_filename,
-        )
+        # 🏊 Reuse an already-authenticated client if one is waiting in the pool
+        self._pool_key = (hostname, username, port, key_filename)
+        self._client = checkout_client(self._pool_key)
+        if self._client is not None:
+            try:
+                # ⏱️ A pooled transport can look alive and still never answer - don't wait long
+                self._open_shell(timeout=POOLED_SHELL_TIMEOUT)
+            except (SSHException, OSError, EOFError, TimeoutError):
+                # 🧟 Stale client: throw it away and shake hands from scratch
+                self._discard_shell()
+                self._client.close()
+                self._client = None
+
+        if self._client is None:
+            # 🎭 Create and configure our SSH client
+            self._client = paramiko.SSHClient()
+            # Equivalent to load_system_host_keys(), minus re-reading an unchanged known_hosts
+            self._client._system_host_keys = load_system_host_keys()
+            self._client.set_missing_host_key_policy(paramiko.WarningPolicy())
+
+            # 🚀 Launch the connection!
+            self._client.connect(
+                hostname=hostname,
+                username=username,
+                port=port,
+                key_filename=key_filename,
+                gss_auth=False,  # 🚫 No Kerberos probing - Junos boxes are key/password only
+                gss_kex=False,
+                banner_timeout=10,  # ⏱️ Give up quickly on a device that never says hello
+                auth_timeout=10,
+            )
+            # 💓 Keep quiet sessions (long commands, pooled clients) from being dropped
+            transport = self._client.get_transport()
+            transport.set_keepalive(30)
+            # ⚡ Small command lines shouldn't sit in Nagle's buffer waiting for an ACK
+            if isinstance(transport.sock, socket.socket):  # Not for ProxyCommand pipes
+                transport.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._open_shell()
 
         # 🎉 Set up our cozy environment
         self.__connected = True
@@ -104,23 +384,40 @@ class SSHWrapperParamiko(SSHWrapper):
         self._env.update(self.envdelta_init)
         self._env['PAGER'] = 'cat'  # No paging, we want it all at once!
 
-        # 🎭 Set up our interactive shell
-        self._shell_channel = self._client.invoke_shell()
-        # Wait for the welcome party
-        time.sleep(2)
-        self._read_until_prompt()
-
-        # 🎨 Configure Junos CLI settings (making it work just right)
-        self._shell_channel.send('set cli complete-on-space off\n')
-        self._read_until_prompt()
-        self._shell_channel.send('set cli screen-length 0\n')
-        self._read_until_prompt()
-        
-        # Send a newline for good measure (like clearing your throat)
-        self._shell_channel.send('\n')
-        self._read_until_prompt()
+        # 🎨 Configure Junos CLI settings (making it work just right), plus a
+        # newline for good measure (like clearing your throat) - all in one send
+        self._shell_channel.send('set cli complete-on-space off\nset cli screen-length 0\n\n')
+        self._read_until_prompts(3)
+
+    def _open_shell(self, timeout=30):
+        """
+        🎭 Open the interactive shell and wait for its first prompt
+
+        Args:
+            timeout: Seconds allowed for opening the channel and for the welcome prompt
+        """
+        # Same as SSHClient.invoke_shell(), but the channel open can't hang for an hour
+        self._shell_channel = self._client.get_transport().open_session(timeout=timeout)
+        self._shell_channel.get_pty()
+        self._shell_channel.invoke_shell()
+        # 🔀 One stream to read: anything sent as stderr lands in recv() too
+        self._shell_channel.set_combine_stderr(True)
+        # 👂 Register the shell once so every read can wait on it without polling
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._shell_channel, selectors.EVENT_READ)
+        # Wait for the welcome party (returns as soon as the first prompt shows up)
+        self._read_until_prompt(timeout=timeout)
+
+    def _discard_shell(self):
+        """🧹 Drop a half-opened shell channel and its selector"""
+        if self._shell_channel:
+            self._shell_channel.close()
+        if self._selector:
+            self._selector.close()
+        self._shell_channel = None
+        self._selector = None
 
-    def _read_until_prompt(self, timeout=30):
+    def _read_until_prompt(self, timeout=30, on_output=None, questions=False):
         """
         📖 Read shell output until we see a prompt
         
@@ -135,40 +432,101 @@ class SSHWrapperParamiko(SSHWrapper):
         
         Args:
             timeout: How long to wait (in seconds) before giving up
+            on_output: Optional callable that gets finished lines (a str ending in
+                a newline) as soon as they arrive, instead of them piling up here
+            questions: Also stop at a "[yes,no] (no)" confirmation, so the caller
+                can send the answer
             
         Returns:
-            str: Everything we read until we found a prompt
+            str: Everything we read until we found a prompt or question (with
+            `on_output`, only what came after the last line handed to it)
             
         Raises:
             TimeoutError: If we don't see a prompt within timeout seconds
+            EOFError: If the remote side closes the shell before a prompt shows up
         """
-        buffer = ""
+        # Raw bytes, decoded once at the end (so split UTF-8 characters are no problem)
+        buf = bytearray()
         start_time = time.time()
         
         while True:
             if self._shell_channel.recv_ready():
-                chunk = self._shell_channel.recv(4096).decode('utf-8', errors='replace')
-                buffer += chunk
+                # 🥤 Drain everything that has already arrived before looking at the tail
+                seen = len(buf)
+                while self._shell_channel.recv_ready():
+                    buf += self._shell_channel.recv(65536)
+
+                # 🎨 Strip escape sequences - starting a little before the new bytes, since a
+                # sequence cut in half by the last read is still waiting for its end there
+                esc = buf.find(b'\x1b', max(0, seen - ANSI_LOOKBACK))
+                if esc != -1:
+                    buf[esc:] = _ANSI_RE.sub(b'', buf[esc:])
+
+                # Prompts and pager markers only ever show up at the very end
+                tail_start = max(0, len(buf) - PROMPT_TAIL_SIZE)
                 
                 # 📜 Handle "More" prompts (because some outputs are chatty)
-                if buffer.endswith('---(more)---'):
+                if buf.endswith(_MORE_TAILS):
                     self._shell_channel.send(' ')  # "Please continue..."
-                    buffer = buffer[:-12]  # Remove the prompt
-                    continue
-                elif buffer.endswith('---(more 100%)---'):
-                    self._shell_channel.send(' ')  # "Almost there..."
-                    buffer = buffer[:-17]  # Remove the prompt
+                    del buf[buf.rindex(b'---(more'):]  # Remove the prompt
                     continue
                 
-                # 🔍 Look for various Junos prompts
-                if re.search(r'(?:\{master:\d+\})?(?:\[edit[^\]]*\])?[a-zA-Z0-9\-_]+@[a-zA-Z0-9\-_]+[%>#](?:\s+\(pending changes\))?\s*$', buffer):
-                    return buffer
+                # 🔍 Look for various Junos prompts - but only bother the regex when the
+                # last visible character could end one ('>', '#', '%' or "(pending changes)")
+                last = buf[tail_start:].rstrip()[-1:]
+                m = last and last in b'%>#)' and _PROMPT_BYTES_RE.search(buf, tail_start)
+                if m:
+                    self._prompt_mode = m.group('mode').decode()  # Remember which mode we landed in
+                elif questions and last == b')':
+                    m = _QUESTION_BYTES_RE.search(buf, tail_start)  # The device wants an answer
+
+                # 📡 Pass finished lines on right away; only the unfinished last line
+                # (where a prompt or pager marker would be) stays in the buffer
+                if on_output is not None:
+                    cut = buf.rfind(b'\n', 0, m.start() if m else len(buf)) + 1
+                    if cut:
+                        on_output(buf[:cut].decode('utf-8', errors='replace'))
+                        del buf[:cut]
+
+                if m:
+                    return buf.decode('utf-8', errors='replace')
                 
+            # 🚪 The other side hung up - no prompt is ever coming
+            if self._shell_channel.eof_received:
+                raise EOFError(
+                    "Shell closed while waiting for prompt. Buffer received: "
+                    + buf.decode('utf-8', errors='replace')
+                )
+
             # ⏰ Check if we've waited too long
-            if time.time() - start_time > timeout:
-                raise TimeoutError(f"Timeout waiting for prompt. Buffer received: {buffer}")
-                
-            time.sleep(0.1)  # Take a short breather
+            remaining = timeout - (time.time() - start_time)
+            if remaining <= 0:
+                raise TimeoutError(
+                    "Timeout waiting for prompt. Buffer received: "
+                    + buf.decode('utf-8', errors='replace')
+                )
+
+            # 💤 Nap until the channel has something for us (no fixed 100 ms tax)
+            self._selector.select(timeout=remaining)
+
+    def _read_until_prompts(self, count, timeout=30):
+        """
+        📖📖 Read until `count` prompts have come back
+
+        For when several lines were sent in one go: a single read may stop at
+        the first prompt, or swallow a few of them at once, so count them.
+
+        Args:
+            count: How many prompts we're waiting for
+            timeout: Per-read timeout, passed on to `_read_until_prompt`
+
+        Returns:
+            str: Everything we read
+        """
+        output = ''
+        while len(_PROMPT_LINE_RE.findall(output)) < count:
+            output += self._read_until_prompt(timeout)
+        return output
 
     def _ensure_clean_prompt(self):
         """
@@ -184,6 +542,7 @@ class SSHWrapperParamiko(SSHWrapper):
         self._shell_channel.send('\x15\n')  # Ctrl+U + newline
         return self._read_until_prompt()
 
+    @_with_shell_lock
     def test_completion(self, cmd, print_function):
         """
         🧪 Test the completion functionality
@@ -223,6 +582,7 @@ class SSHWrapperParamiko(SSHWrapper):
             print_function(f"[DEBUG] Test error: {str(e)}\n{traceback.format_exc()}")
             return False
 
+    @_with_shell_lock
     def exec_command(self, cmd, print_function):
         """
         🎮 Execute a command on the remote server
@@ -245,63 +605,97 @@ class SSHWrapperParamiko(SSHWrapper):
             test_cmd = cmd.split(" ", 1)[1] if " " in cmd else ""
             return 0 if self.test_completion(test_cmd, print_function) else 1
 
-        # Clean up the command
-        cmd = cmd.strip()
-        print_function(f"[ssh] Sending command: {cmd}\n")
-        
-        # Send it off!
-        self._shell_channel.send(cmd + '\n')
-        
+        # Clean up the command - a cell may carry several CLI lines
+        commands = [line.strip() for line in cmd.splitlines() if line.strip()]
+
+        # 📜 Run them one after another on the same shell session
+        exitcode = 0
         try:
-            # Get the response
-            output = self._read_until_prompt()
-            
-            # Clean up the output (remove echoed command and prompt)
-            lines = output.split('\n')
-            if lines and lines[0].strip() == cmd.strip():
-                lines = lines[1:]
-            if lines and re.search(r'(?:\{master:\d+\})?(?:\[edit[^\]]*\])?[a-zA-Z0-9\-_]+@[a-zA-Z0-9\-_]+[%>#]\s*$', lines[-1]):
-                lines = lines[:-1]
-            
-            # Look for error messages
-            error_patterns = [
-                r"^\s*error:",
-                r"^\s*unknown command\.",
-                r"^\s*syntax error\.",
-                r"^\s*invalid command\."
-            ]
-            
-            has_error = False
-            for line in lines:
-                if any(re.search(pattern, line.lower()) for pattern in error_patterns):
-                    has_error = True
-                print_function(line + '\n')
-            
-            # Make sure we're ready for the next command
-            self._ensure_clean_prompt()
-            
-            return 1 if has_error else 0
-            
+            for command in commands:
+                if self._run_command(command, print_function):
+                    exitcode = 1
+
         except TimeoutError as e:
             print_function(f"[ssh] Error: {str(e)}\n")
             self._ensure_clean_prompt()
             return 1
 
+        return exitcode
+
+    def _run_command(self, cmd, print_function):
+        """
+        🏃 Send a single CLI line and relay its output, up to the next prompt
+        (or to a "[yes,no]" question, which the following line then answers)
+
+        Args:
+            cmd: One command line (already stripped)
+            print_function: Function to use for output
+
+        Returns:
+            bool: True if the device answered with an error message
+
+        Raises:
+            TimeoutError: If the prompt never comes back
+        """
+        if self._verbose:
+            print_function(f"[ssh] Sending command: {cmd}\n")
+        
+        # Send it off!
+        self._shell_channel.send(cmd + '\n')
+
+        # 🔀 Changing mode, hierarchy level or the configuration changes what completes
+        verb = cmd.split(None, 1)[0]
+        if verb in _MODE_CHANGING_COMMANDS or verb in _CONFIG_CHANGING_COMMANDS:
+            self._completion_cache.clear()
+        
+        # 📡 Relay the response as it arrives, whole lines at a time, so long
+        # outputs show up while they're still coming (minus our echoed command)
+        has_error = False
+        echo_pending = True
+
+        def relay(text):
+            nonlocal has_error, echo_pending
+            if echo_pending:
+                echo_pending = False
+                echo_end = text.find('\n')
+                if text[:echo_end].strip() == cmd:
+                    text = text[echo_end + 1:]
+            if text:
+                # Error lines are whole lines, so checking each piece is enough
+                has_error = has_error or bool(_ERROR_RE.search(text))
+                print_function(text)
+
+        rest = self._read_until_prompt(on_output=relay, questions=True)
+
+        # 🙋 Stopped at a "[yes,no]" question rather than a prompt? Show it - the
+        # next line of the cell (or the next cell) is the answer
+        if _QUESTION_RE.search(rest):
+            print_function(rest + '\n')
+
+        return has_error
+
+    @_with_shell_lock
     def close(self):
         """
         👋 Close the SSH connection
         
-        All good things must come to an end. This method cleans up our
-        SSH connection and says goodbye to the remote server.
+        All good things must come to an end. This method closes our shell
+        session and parks the authenticated client in the pool, so the next
+        login to the same host skips the handshake (see `drop_client_pool`).
+        Holding the shell lock, so a background prefetch finishes its read first.
         """
         self.__connected = False
         if self._shell_channel:
             self._shell_channel.close()
         if self._client:
-            self._client.close()
+            checkin_client(self._pool_key, self._client)
+        if self._selector:
+            self._selector.close()
         self._shell_channel = None
         self._client = None
+        self._selector = None
 
+    @_with_shell_lock
     def interrupt(self):
         """
         🛑 Interrupt the current command
@@ -311,8 +705,7 @@ class SSHWrapperParamiko(SSHWrapper):
         """
         if self._shell_channel:
             self._shell_channel.send('\x03')  # Ctrl+C
-            time.sleep(0.1)  # Give it a moment
-            self._read_until_prompt()  # Clean up
+            self._read_until_prompt(timeout=5)  # Clean up - returns as soon as the prompt is back
 
     def isconnected(self):
         """
@@ -323,198 +716,155 @@ class SSHWrapperParamiko(SSHWrapper):
         """
         return self.__connected
 
-    def _get_completions_cli_command(self, partial_cmd):
-        """Get completions using 'show cli complete-on' command"""
-        try:
-            # Send completion command without quotes
-            completion_cmd = f'show cli complete-on "{partial_cmd}"'
-            print(f"[DEBUG] Trying CLI completion with command: {completion_cmd}")
-            self._shell_channel.send(completion_cmd + '\n')
-            
-            output = self._read_until_prompt()
-            print(f"[DEBUG] CLI completion output:\n{output}")
-            lines = output.split('\n')
-            completions = []
-            
-            # Skip the first line (echo of our command) and last line (prompt)
-            for line in lines[1:-1]:
-                if not line.strip() or line.strip() == "Possible completions:":
-                    continue
-                    
-                # Split on first whitespace sequence
-                parts = line.strip().split(None, 1)
-                if parts:
-                    word = parts[0]
-                    # Only add if it's a valid completion (not a parameter hint)
-                    if not word.startswith('<') and not word.endswith('>'):
-                        completions.append(word)
-            
-            # Ensure we're at a clean prompt
-            self._ensure_clean_prompt()
-            
-            print(f"[DEBUG] CLI completions found: {completions}")
-            # If we got completions and no error message, return them
-            if completions and not any("error: unknown command" in line.lower() for line in lines):
-                return completions
-            
-            return None  # Signal to try fallback method
-            
-        except Exception as e:
-            print(f"[DEBUG] CLI completion error: {str(e)}")
-            self._ensure_clean_prompt()  # Always ensure clean prompt on error
-            return None  # Signal to try fallback method
-
     def _get_completions_question_mark(self, partial_cmd, print_function=print):
-        """Get completions using question mark method"""
+        """Get completions using question mark method (expects to start at a clean prompt)"""
         try:
-            # First ensure we're at a clean prompt
-            self._ensure_clean_prompt()
-            
-            # Send the partial command with ?
-            print_function(f"[DEBUG] Trying ? completion with: {partial_cmd}?")
-            self._shell_channel.send(partial_cmd + '?\n')
+            # Send the partial command with ? - on an empty line the redrawn prompt alone
+            # ends the read, so no newline there (its extra prompt would leave us one behind)
+            if self._debug:
+                print_function(f"[DEBUG] Trying ? completion with: {partial_cmd}?")
+            self._shell_channel.send(partial_cmd + '?\n' if partial_cmd else '?')
             
             # Read the completion suggestions
             output = self._read_until_prompt()
-            print_function(f"[DEBUG] Raw ? completion output:\n{output}")
-            
-            # Parse the completion output
-            lines = output.split('\n')
-            completions = []
+            if self._debug:
+                print_function(f"[DEBUG] Raw ? completion output:\n{output}")
             
-            print_function(f"[DEBUG] Processing {len(lines)} lines")
-            in_completions = False
-            # Skip the first line (echo of our command) and last line (prompt)
-            for i, line in enumerate(lines[1:-1]):
-                print_function(f"[DEBUG] Processing line {i+1}: '{line}'")
-                
-                # Skip empty lines
-                if not line.strip():
-                    print_function(f"[DEBUG] Skipping empty line")
-                    continue
-                
-                # Check for completion section start
-                if "Possible completions:" in line:
-                    print_function(f"[DEBUG] Found completions section")
-                    in_completions = True
-                    continue
-                
-                # Skip if we haven't reached completions yet
-                if not in_completions:
-                    continue
-                
-                # Stop if we hit an error message or prompt
-                if any(x in line.lower() for x in ["error:", "syntax error:", "[edit]"]):
-                    print_function(f"[DEBUG] Found end of completions: {line}")
-                    break
-                
-                # Parse the completion line
-                # Format is typically: "> command           Description"
-                line = line.strip()
-                if line.startswith('>'):
-                    line = line[1:].strip()  # Remove '>' prefix
-                
-                # Split on multiple spaces to separate command from description
-                parts = line.split('  ', 1)
-                if parts:
-                    word = parts[0].strip()
-                    print_function(f"[DEBUG] Found word: '{word}'")
-                    
-                    # Get the base command (everything up to the last space)
-                    base_cmd = partial_cmd.rsplit(' ', 1)[0] if ' ' in partial_cmd else ''
-                    current_word = partial_cmd.rsplit(' ', 1)[-1] if ' ' in partial_cmd else partial_cmd
-                    
-                    print_function(f"[DEBUG] Base command: '{base_cmd}', Current word: '{current_word}'")
-                    
-                    # Check if the word matches our current word
-                    if word.startswith(current_word):
-                        if base_cmd:
-                            full_completion = f"{base_cmd} {word}"
-                        else:
-                            full_completion = word
-                        print_function(f"[DEBUG] Adding completion: '{full_completion}'")
-                        completions.append(full_completion)
+            # 📋 Parse the completion output in one pass
+            words = _parse_completions(output)
+            if self._debug:
+                print_function(f"[DEBUG] Found words: {words}")
+
+            # Keep the ones that continue the word being typed, behind the words before it
+            base_cmd, _, current_word = partial_cmd.rpartition(' ')
+            if self._debug:
+                print_function(f"[DEBUG] Base command: '{base_cmd}', Current word: '{current_word}'")
+
+            completions = [
+                f"{base_cmd} {word}" if base_cmd else word
+                for word in words
+                if word.startswith(current_word)
+            ]
             
-            # Clear any remaining ? and buffer
-            self._shell_channel.send('\x15\n')  # Ctrl+U + newline to clear line
-            self._read_until_prompt()
-            self._shell_channel.send('\n')  # Extra newline to ensure clean state
+            # Clear any remaining ? and buffer (Ctrl+U + newline leaves a fresh prompt)
+            self._shell_channel.send('\x15\n')
             self._read_until_prompt()
             
-            print_function(f"[DEBUG] Final completions: {completions}")
+            if self._debug:
+                print_function(f"[DEBUG] Final completions: {completions}")
             return completions
             
         except Exception as e:
-            print_function(f"[DEBUG] ? completion error: {str(e)}\n{traceback.format_exc()}")
+            if self._debug:
+                print_function(f"[DEBUG] ? completion error: {str(e)}\n{traceback.format_exc()}")
             # Ensure we clean up even on error
             self._shell_channel.send('\x15\n')  # Ctrl+U + newline
             self._read_until_prompt()
-            self._shell_channel.send('\n')  # Extra newline
-            self._read_until_prompt()
             return []
 
     def _get_completions(self, partial_cmd, print_function=print):
-        """Get completion suggestions for a partial command"""
+        """Get completion suggestions for a partial command, remembering the answers"""
+        key = (self._host, self._prompt_mode, partial_cmd)
+        now = time.monotonic()
+        entry = self._completion_cache.get(key)
+        if entry and now - entry[0] < COMPLETION_CACHE_TTL:
+            self._completion_cache.move_to_end(key)
+            return entry[1]
+
+        completions = self._fetch_completions(partial_cmd, print_function)
+
+        # An empty answer may just be a hiccup on the wire - ask again next time
+        if completions:
+            self._completion_cache[key] = (now, completions)
+            self._completion_cache.move_to_end(key)
+            if len(self._completion_cache) > COMPLETION_CACHE_SIZE:
+                self._completion_cache.popitem(last=False)
+
+        return completions
+
+    def _fetch_completions(self, partial_cmd, print_function=print):
+        """Ask the device for completion suggestions for a partial command"""
         try:
             # First ensure we're at a clean prompt
-            output = self._ensure_clean_prompt()
-            print_function(f"[DEBUG] Current prompt: {output.splitlines()[-1] if output else 'No output'}")
+            self._ensure_clean_prompt()
             
-            # Check if we're in configuration mode
-            is_config_mode = '#' in (output.splitlines()[-1] if output else '')
-            print_function(f"[DEBUG] In configuration mode: {is_config_mode}")
+            # Check if we're in configuration mode (the prompt we just read tells us)
+            is_config_mode = self._prompt_mode == '#'
+            if self._debug:
+                print_function(f"[DEBUG] In configuration mode: {is_config_mode}")
             
             # In configuration mode, we need to handle the command differently
             if is_config_mode:
                 # Try without 'set' first if it's already there
                 if partial_cmd.startswith('set '):
                     base_cmd = partial_cmd[4:]
-                    print_function(f"[DEBUG] Trying completion without 'set': {base_cmd}")
+                    if self._debug:
+                        print_function(f"[DEBUG] Trying completion without 'set': {base_cmd}")
                     completions = self._get_completions_question_mark(base_cmd, print_function)
                     if completions:
                         # Add 'set' back to the completions
                         return ['set ' + c for c in completions]
                 
                 # If that didn't work or if 'set' wasn't there, try with the full command
-                print_function(f"[DEBUG] Trying completion with full command: {partial_cmd}")
+                if self._debug:
+                    print_function(f"[DEBUG] Trying completion with full command: {partial_cmd}")
                 return self._get_completions_question_mark(partial_cmd, print_function)
             else:
                 # In operational mode, just try the command as is
                 return self._get_completions_question_mark(partial_cmd, print_function)
             
         except Exception as e:
-            print_function(f"[DEBUG] Completion error in _get_completions: {str(e)}\n{traceback.format_exc()}")
+            if self._debug:
+                print_function(f"[DEBUG] Completion error in _fetch_completions: {str(e)}\n{traceback.format_exc()}")
             return []
 
+    @_with_shell_lock
+    def prefetch_commands(self):
+        """
+        🎣 Fetch the top-level operational commands once, right after login
+
+        Single-word completions at the operational prompt are then answered
+        from this list without a round-trip to the device.
+        """
+        if not self.isconnected():  # Logged out before our turn came - nothing to ask
+            return
+        commands = self._get_completions_question_mark('', lambda *args: None)
+        self._commands = sorted(set(commands))
+
+    @_with_shell_lock
     def get_completions(self, text, print_function=print):
         """Get completion suggestions for the current text"""
         try:
             if not text.strip():
                 return []
                 
-            print_function(f"[DEBUG] Getting completions for: '{text}'")
+            if self._debug:
+                print_function(f"[DEBUG] Getting completions for: '{text}'")
             # Clean the input text
             text = text.strip()
+
+            # ⚡ A single word at the operational prompt? The prefetched list knows
+            if self._commands and ' ' not in text and self._prompt_mode == '>':
+                return prefix_matches(self._commands, text)
             
             # Get all possible completions
             completions = self._get_completions(text, print_function)
             
-            # Return all completions that extend the current text
-            matches = []
-            for comp in completions:
-                comp = comp.strip()
-                print_function(f"[DEBUG] Checking completion: '{comp}' against text: '{text}'")
-                # Only add completions that extend the current text
-                if comp.startswith(text) and comp != text:
-                    print_function(f"[DEBUG] Adding match: '{comp}'")
-                    matches.append(comp)
+            # Return all completions that extend the current text (sorted, no duplicates) -
+            # filter first, so only the survivors get sorted
+            n = len(text)
+            matches = sorted({
+                comp for comp in map(str.strip, completions)
+                if len(comp) > n and comp.startswith(text)
+            })
             
-            print_function(f"[DEBUG] Final filtered matches: {matches}")
+            if self._debug:
+                print_function(f"[DEBUG] Final filtered matches: {matches}")
             
-            # Sort and remove duplicates while preserving case
-            return sorted(list(set(matches)), key=str.lower)
+            return matches
             
         except Exception as e:
-            print_function(f"[DEBUG] Completion error: {str(e)}")
+            if self._debug:
+                print_function(f"[DEBUG] Completion error: {str(e)}")
             # If anything goes wrong, return empty list
             return [] 
\ No newline at end of file
@@ -5,8 +5,8 @@ from unittest.mock import patch
 import unittest
 
 from ipykernel.kernelbase import Kernel
-from sshkernel import ExceptionWrapper
-from sshkernel import SSHException
+from metakernel import ExceptionWrapper
+from paramiko import SSHException
 from sshkernel.exception import SSHKernelNotConnectedException
 from sshkernel.kernel import SSHKernel
 from sshkernel.ssh_wrapper import SSHWrapper
@@ -140,6 +140,17 @@ class SSHKernelTest(unittest.TestCase):
             connected_double.assert_called_once()
             self.assertEqual(matches["matches"], [])
 
+    @patch("sshkernel.kernel.SSHKernel.sshwrapper", new_callable=PropertyMock)
+    def test_do_complete_after_separator_skips_remote(self, mock):
+        self.instance.sshwrapper.get_completions = Mock(return_value=[])
+
+        for code in ["show ", "show;", "show\t"]:
+            matches = self.instance.do_complete(code, len(code))
+
+            self.assertEqual(matches["matches"], [])
+
+        self.instance.sshwrapper.get_completions.assert_not_called()
+
     def check_completion(self, result):
         self.assertIsInstance(result, dict)
         self.assertEqual(result["status"], "ok")
@@ -149,6 +160,7 @@ class SSHKernelTest(unittest.TestCase):
         self.assertEqual(matches, sorted(matches))
         self.assertEqual(matches, [e.rstrip() for e in matches])
 
+    @unittest.skip("Bash completion was replaced by the Junos '?' listing")
     @patch("sshkernel.kernel.SSHKernel.sshwrapper", new_callable=PropertyMock)
     def test_complete_bash_variables(self, mock):
         def exec_double(cmd, callback):
@@ -177,6 +189,7 @@ class SSHKernelTest(unittest.TestCase):
             ["$BASH_ARGC", "$BASH_ARGV", "$BASH_LINENO", "$BASH_REMATCH"],
         )
 
+    @unittest.skip("Bash completion was replaced by the Junos '?' listing")
     @patch("sshkernel.kernel.SSHKernel.sshwrapper", new_callable=PropertyMock)
     def test_complete_bash_commands(self, mock):
         def exec_double(cmd, callback):
@@ -200,6 +213,19 @@ class SSHKernelTest(unittest.TestCase):
 
         self.assertEqual(res["matches"], ["ls", "lslogins", "lspcmcia"])
 
+    @patch("sshkernel.kernel.SSHKernel.sshwrapper", new_callable=PropertyMock)
+    def test_complete_asks_the_wrapper_every_time(self, mock):
+        self.instance.sshwrapper.get_completions = Mock(
+            return_value=["show version", "show vlans"]
+        )
+
+        first = self.instance.do_complete("show v", 6)
+        second = self.instance.do_complete("show v", 6)
+
+        self.assertEqual(first["matches"], ["ersion ", "lans "])
+        self.assertEqual(second["matches"], first["matches"])
+        self.assertEqual(self.instance.sshwrapper.get_completions.call_count, 2)
+
     def test_sshwrapper_setter(self):
         self.assertIsNone(self.instance.sshwrapper)
         self.assertIsNone(self.instance._sshwrapper)
@@ -0,0 +1,441 @@
+import os
+import tempfile
+import threading
+import unittest
+from textwrap import dedent
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from sshkernel.ssh_wrapper_paramiko import CLIENT_POOL_SIZE
+from sshkernel.ssh_wrapper_paramiko import SSHWrapperParamiko
+from sshkernel.ssh_wrapper_paramiko import _parse_completions
+from sshkernel.ssh_wrapper_paramiko import checkin_client
+from sshkernel.ssh_wrapper_paramiko import checkout_client
+from sshkernel.ssh_wrapper_paramiko import drop_client_pool
+from sshkernel.ssh_wrapper_paramiko import load_ssh_config
+from sshkernel.ssh_wrapper_paramiko import load_system_host_keys
+from sshkernel.ssh_wrapper_paramiko import prefix_matches
+
+
+class UtilityTest(unittest.TestCase):
+    def test_load_ssh_config_reuses_parse_until_file_changes(self):
+        with tempfile.NamedTemporaryFile("w") as f:
+            f.write(
+                dedent(
+                    """
+                    Host test
+                        HostName 127.0.0.10
+                    """
+                )
+            )
+            f.flush()
+
+            first = load_ssh_config(f.name)
+            second = load_ssh_config(f.name)
+            self.assertIs(first, second)
+            self.assertEqual(first.lookup("test")["hostname"], "127.0.0.10")
+
+            f.write("    User admin\n")
+            f.flush()
+            st = os.stat(f.name)
+            os.utime(f.name, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+
+            third = load_ssh_config(f.name)
+            self.assertIsNot(first, third)
+            self.assertEqual(third.lookup("test")["user"], "admin")
+
+    def test_prefix_matches(self):
+        candidates = ["show", "show interfaces", "show version", "show vlans", "start"]
+
+        self.assertEqual(
+            prefix_matches(candidates, "show v"), ["show version", "show vlans"]
+        )
+        self.assertEqual(prefix_matches(candidates, "show"), candidates[1:4])
+        self.assertEqual(prefix_matches(candidates, "x"), [])
+
+    def test_parse_completions(self):
+        output = (
+            "show ?\r\n"
+            "Possible completions:\r\n"
+            "  arp                  Show system Address Resolution Protocol table entries\r\n"
+            "> interfaces           Show interface information\r\n"
+            "  system reboot        Show pending reboot\r\n"
+            "\r\n"
+            "[edit]\r\n"
+            "admin@r1# show "
+        )
+
+        self.assertEqual(
+            _parse_completions(output), ["arp", "interfaces", "system reboot"]
+        )
+        self.assertEqual(_parse_completions("shwo ?\r\nadmin@r1> shwo "), [])
+
+    def test_parse_completions_stops_at_first_prompt(self):
+        output = (
+            "?\r\n"
+            "Possible completions:\r\n"
+            "  clear                Clear information in the system\r\n"
+            "  show                 Show system information\r\n"
+            "admin@r1> \r\n"
+            "admin@r1> "
+        )
+
+        self.assertEqual(_parse_completions(output), ["clear", "show"])
+
+    def test_load_ssh_config_missing_file(self):
+        config = load_ssh_config("/nonexistent/ssh_config")
+
+        self.assertEqual(config.lookup("test")["hostname"], "test")
+
+    @patch("sshkernel.ssh_wrapper_paramiko._system_host_keys", (None, None))
+    def test_load_system_host_keys_reuses_parse_until_file_changes(self):
+        key = "AAAAC3NzaC1lZDI1NTE5AAAAIOMqqnkVzrm0SdG6UOoqKLsabgH5C9okWi0dh2l9GKJl"
+        with tempfile.NamedTemporaryFile("w") as f, patch(
+            "sshkernel.ssh_wrapper_paramiko.KNOWN_HOSTS_FILE", f.name
+        ):
+            f.write("r1 ssh-ed25519 {}\n".format(key))
+            f.flush()
+
+            first = load_system_host_keys()
+            second = load_system_host_keys()
+            self.assertIs(first, second)
+            self.assertIn("r1", first)
+
+            f.write("r2 ssh-ed25519 {}\n".format(key))
+            f.flush()
+            st = os.stat(f.name)
+            os.utime(f.name, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+
+            third = load_system_host_keys()
+            self.assertIsNot(first, third)
+            self.assertIn("r2", third)
+
+    @patch("sshkernel.ssh_wrapper_paramiko._system_host_keys", (None, None))
+    @patch("sshkernel.ssh_wrapper_paramiko.KNOWN_HOSTS_FILE", "/nonexistent/known_hosts")
+    def test_load_system_host_keys_missing_file(self):
+        self.assertEqual(len(load_system_host_keys()), 0)
+
+    @patch("sshkernel.ssh_wrapper_paramiko._system_host_keys", (None, None))
+    def test_load_system_host_keys_unreadable_path(self):
+        with tempfile.TemporaryDirectory() as d, tempfile.NamedTemporaryFile() as f:
+            # A directory (IsADirectoryError) and a path below a file (NotADirectoryError)
+            for path in (d, os.path.join(f.name, "known_hosts")):
+                with patch("sshkernel.ssh_wrapper_paramiko.KNOWN_HOSTS_FILE", path):
+                    self.assertEqual(len(load_system_host_keys()), 0)
+
+    @patch("sshkernel.ssh_wrapper_paramiko._system_host_keys", (None, None))
+    @patch("paramiko.HostKeys.load", side_effect=PermissionError)
+    def test_load_system_host_keys_load_error(self, load):
+        with tempfile.NamedTemporaryFile("w") as f, patch(
+            "sshkernel.ssh_wrapper_paramiko.KNOWN_HOSTS_FILE", f.name
+        ):
+            self.assertEqual(len(load_system_host_keys()), 0)
+
+
+class ClientPoolTest(unittest.TestCase):
+    def setUp(self):
+        drop_client_pool()
+
+    def tearDown(self):
+        drop_client_pool()
+
+    def new_client(self, active=True):
+        client = Mock()
+        client.get_transport.return_value.is_active.return_value = active
+        return client
+
+    def test_checkin_then_checkout_reuses_client(self):
+        key = ("10.0.0.1", "admin", 22, None)
+        client = self.new_client()
+
+        checkin_client(key, client)
+
+        self.assertIs(checkout_client(key), client)
+        self.assertIsNone(checkout_client(key))
+        client.close.assert_not_called()
+
+    def test_checkin_closes_dead_client(self):
+        key = ("10.0.0.1", "admin", 22, None)
+        client = self.new_client(active=False)
+
+        checkin_client(key, client)
+
+        client.close.assert_called_once()
+        self.assertIsNone(checkout_client(key))
+
+    def test_pool_evicts_oldest_over_capacity(self):
+        clients = [self.new_client() for _ in range(CLIENT_POOL_SIZE + 1)]
+        for i, client in enumerate(clients):
+            checkin_client(("host", "user", i, None), client)
+
+        clients[0].close.assert_called_once()
+        for client in clients[1:]:
+            client.close.assert_not_called()
+
+    def test_drop_client_pool_closes_everything(self):
+        client = self.new_client()
+        checkin_client(("host", "user", 22, None), client)
+
+        drop_client_pool()
+
+        client.close.assert_called_once()
+
+
+class SSHWrapperParamikoTest(unittest.TestCase):
+    def setUp(self):
+        self.instance = SSHWrapperParamiko()
+        self.instance._get_completions = Mock(return_value=[])
+
+    def feed(self, *chunks):
+        """Make the shell hand out `chunks` one recv() each; None is a pause"""
+        pending = [chunk if chunk is None else chunk.encode() for chunk in chunks]
+
+        def recv_ready():
+            if pending and pending[0] is None:
+                pending.pop(0)
+                return False
+            return bool(pending)
+
+        channel = Mock(eof_received=False)
+        channel.recv_ready.side_effect = recv_ready
+        channel.recv.side_effect = lambda size: pending.pop(0)
+        self.instance._shell_channel = channel
+        self.instance._selector = Mock()
+        self.instance._SSHWrapperParamiko__connected = True
+
+    def test_single_word_completion_uses_prefetched_commands(self):
+        self.instance._commands = ["clear", "configure", "show"]
+        self.instance._prompt_mode = ">"
+
+        matches = self.instance.get_completions("c", Mock())
+
+        self.assertEqual(matches, ["clear", "configure"])
+        self.instance._get_completions.assert_not_called()
+
+    def test_config_mode_completion_skips_prefetched_commands(self):
+        self.instance._commands = ["clear", "configure", "show"]
+        self.instance._prompt_mode = "#"
+
+        self.instance.get_completions("c", Mock())
+
+        self.instance._get_completions.assert_called_once()
+
+    def test_completions_are_cached_per_mode(self):
+        self.instance._fetch_completions = Mock(return_value=["show version"])
+        del self.instance._get_completions
+        self.instance._prompt_mode = ">"
+
+        self.instance.get_completions("show v", Mock())
+        self.instance.get_completions("show v", Mock())
+        self.assertEqual(self.instance._fetch_completions.call_count, 1)
+
+        self.instance._prompt_mode = "#"
+        self.instance.get_completions("show v", Mock())
+        self.assertEqual(self.instance._fetch_completions.call_count, 2)
+
+    def test_empty_completions_are_not_cached(self):
+        self.instance._fetch_completions = Mock(return_value=[])
+        del self.instance._get_completions
+
+        self.instance.get_completions("show v", Mock())
+        self.instance.get_completions("show v", Mock())
+
+        self.assertEqual(self.instance._fetch_completions.call_count, 2)
+
+    def test_run_command_trims_echo_and_prompt(self):
+        self.feed("show version\r\nJunos: 20.4\r\n\r\nadmin@r1> ")
+        print_function = Mock()
+
+        has_error = self.instance._run_command("show version", print_function)
+
+        self.assertFalse(has_error)
+        print_function.assert_called_once_with("Junos: 20.4\r\n\r\n")
+
+    def test_run_command_reports_error(self):
+        self.feed("shwo\r\n         ^\r\nunknown command.\r\nadmin@r1> ")
+        print_function = Mock()
+
+        self.assertTrue(self.instance._run_command("shwo", print_function))
+
+    def test_config_change_clears_completion_cache(self):
+        self.instance._fetch_completions = Mock(return_value=["ge-0/0/0"])
+        del self.instance._get_completions
+        self.feed("set interfaces ge-0/0/1 unit 0\r\n\r\n[edit]\r\nadmin@r1# ")
+
+        self.instance.get_completions("set interfaces ", Mock())
+        self.instance._run_command("set interfaces ge-0/0/1 unit 0", Mock())
+        self.instance.get_completions("set interfaces ", Mock())
+
+        self.assertEqual(self.instance._fetch_completions.call_count, 2)
+
+    def test_run_command_streams_lines_as_they_arrive(self):
+        self.feed("show log messages\r\nline 1\r\nli", None, "ne 2\r\n\r\nadmin@r1> ")
+        print_function = Mock()
+
+        self.instance._run_command("show log messages", print_function)
+
+        self.assertEqual(
+            [c.args[0] for c in print_function.call_args_list],
+            ["line 1\r\n", "line 2\r\n\r\n"],
+        )
+
+    def test_device_completions_are_filtered_and_deduplicated(self):
+        self.instance._get_completions.return_value = [
+            "show vlans", " show version", "show version", "show v", "start",
+        ]
+
+        self.assertEqual(
+            self.instance.get_completions("show v", Mock()),
+            ["show version", "show vlans"],
+        )
+
+    def test_read_until_prompt_pages_through_more(self):
+        self.feed("line 1\r\n---(more 100%)---", None, "\rline 2\r\nadmin@r1> ")
+
+        output = self.instance._read_until_prompt()
+
+        self.instance._shell_channel.send.assert_called_once_with(" ")
+        self.assertEqual(output, "line 1\r\n\rline 2\r\nadmin@r1> ")
+
+    def test_read_until_prompt_strips_ansi_sequences(self):
+        self.feed("\x1b[1mline 1\x1b[0m\r\nadmin@r1> \x1b[K")
+
+        self.assertEqual(self.instance._read_until_prompt(), "line 1\r\nadmin@r1> ")
+
+        # A sequence split across two reads is stripped once it's complete
+        self.feed("line 1\r\nadmin@r1> \x1b[", None, "K")
+
+        self.assertEqual(self.instance._read_until_prompt(), "line 1\r\nadmin@r1> ")
+
+    def test_config_mode_set_completion_stops_after_first_answer(self):
+        self.instance._ensure_clean_prompt = Mock()
+        self.instance._prompt_mode = "#"
+        self.instance._get_completions_question_mark = Mock(
+            return_value=["interfaces ge-0/0/0"]
+        )
+
+        completions = self.instance._fetch_completions("set interfaces g", Mock())
+
+        self.assertEqual(completions, ["set interfaces ge-0/0/0"])
+        self.instance._get_completions_question_mark.assert_called_once()
+
+    def test_prefetch_ignores_prompts_read_with_the_listing(self):
+        self.feed(
+            "?\r\nPossible completions:\r\n"
+            "  clear                Clear information in the system\r\n"
+            "  show                 Show system information\r\n"
+            "admin@r1> \r\nadmin@r1> ",
+            None,
+            "\r\nadmin@r1> ",
+        )
+
+        self.instance.prefetch_commands()
+
+        self.assertEqual(self.instance._commands, ["clear", "show"])
+
+    def test_prefetch_leaves_shell_at_one_prompt(self):
+        self.feed(
+            "?\r\nPossible completions:\r\n"
+            "  clear                Clear information in the system\r\n"
+            "  show                 Show system information\r\n"
+            "admin@r1> ",
+            None,
+            "\r\nadmin@r1> ",
+            None,
+            "show version\r\nJunos: 20.4\r\n\r\nadmin@r1> ",
+        )
+        print_function = Mock()
+
+        self.instance.prefetch_commands()
+        self.instance._run_command("show version", print_function)
+
+        self.assertEqual(
+            [c.args[0] for c in self.instance._shell_channel.send.call_args_list],
+            ["?", "\x15\n", "show version\n"],
+        )
+        self.assertEqual(self.instance._commands, ["clear", "show"])
+        print_function.assert_called_once_with("Junos: 20.4\r\n\r\n")
+
+    def test_prefetch_after_close_does_nothing(self):
+        self.feed()
+        self.instance.close()
+
+        self.instance.prefetch_commands()
+
+        self.assertEqual(self.instance._commands, [])
+
+    def test_close_waits_for_the_shell_lock(self):
+        self.feed()
+        channel = self.instance._shell_channel
+        closer = threading.Thread(target=self.instance.close)
+
+        with self.instance._shell_lock:
+            closer.start()
+            closer.join(0.1)
+            self.assertTrue(closer.is_alive())
+            channel.close.assert_not_called()
+
+        closer.join()
+        channel.close.assert_called_once()
+
+    @patch("sshkernel.ssh_wrapper_paramiko.selectors.DefaultSelector")
+    @patch("sshkernel.ssh_wrapper_paramiko.paramiko.SSHClient")
+    def test_connect_replaces_stale_pooled_client(self, client_class, _selector):
+        stale = Mock()
+        stale.get_transport.return_value.open_session.side_effect = EOFError
+        drop_client_pool()
+        self.addCleanup(drop_client_pool)
+        checkin_client(("r1", None, 22, None), stale)
+        self.instance._read_until_prompts = Mock()
+
+        with patch.object(self.instance, "_read_until_prompt") as read:
+            self.instance.connect("r1")
+
+        stale.close.assert_called_once()
+        client_class.return_value.connect.assert_called_once()
+        self.assertIs(self.instance._client, client_class.return_value)
+        read.assert_called_once_with(timeout=30)
+
+    def test_exec_command_runs_each_line(self):
+        self.feed(
+            "show version\r\nJunos: 20.4\r\n\r\nadmin@r1> ",
+            None,
+            "shwo\r\n         ^\r\nunknown command.\r\nadmin@r1> ",
+        )
+        print_function = Mock()
+
+        exitcode = self.instance.exec_command("show version\n\nshwo\n", print_function)
+
+        self.assertEqual(exitcode, 1)
+        self.assertEqual(
+            [c.args[0] for c in self.instance._shell_channel.send.call_args_list],
+            ["show version\n", "shwo\n"],
+        )
+        self.assertEqual(
+            [c.args[0] for c in print_function.call_args_list],
+            ["Junos: 20.4\r\n\r\n", "         ^\r\nunknown command.\r\n"],
+        )
+
+    def test_exec_command_answers_confirmation_with_next_line(self):
+        self.feed(
+            "exit\r\nExit with uncommitted changes? [yes,no] (yes) ",
+            None,
+            "yes\r\n\r\nExiting configuration mode\r\n\r\nadmin@r1> ",
+        )
+        print_function = Mock()
+
+        exitcode = self.instance.exec_command("exit\nyes", print_function)
+
+        self.assertEqual(exitcode, 0)
+        self.assertEqual(
+            [c.args[0] for c in self.instance._shell_channel.send.call_args_list],
+            ["exit\n", "yes\n"],
+        )
+        self.assertEqual(
+            [c.args[0] for c in print_function.call_args_list],
+            [
+                "Exit with uncommitted changes? [yes,no] (yes) \n",
+                "\r\nExiting configuration mode\r\n\r\n",
+            ],
+        )
+        self.assertEqual(self.instance._prompt_mode, ">")